@@ -1,16 +1,21 @@
 import streamlit as st
 import requests
-import json
 import os
 import logging
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Iterator
 import pandas as pd
-import random
+import numpy as np
+import orjson
 import math
+from bisect import bisect_left, bisect_right
 import hashlib
-from dataclasses import dataclass
+import re
+import string
+from dataclasses import dataclass, asdict
+from types import MappingProxyType
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Configuration
 st.set_page_config(
@@ -24,6 +29,24 @@ st.set_page_config(
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Random generators for simulated weather/facility data
+def seeded_rng(*key) -> np.random.Generator:
+    """Generator seeded from a stable digest of key, so simulated data is reproducible"""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).digest()
+    return np.random.default_rng(int.from_bytes(digest, 'little'))
+
+# Shared HTTP session (keep-alive + connection pooling for external APIs)
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Process-wide HTTP session so pooled connections survive Streamlit reruns"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=50,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    ))
+    return session
+
 # Data Classes for Type Safety
 @dataclass
 class PatientData:
@@ -51,6 +74,21 @@ class HealthMetrics:
     recommendations: List[str]
 
 # Advanced API Configuration
+@st.cache_resource(show_spinner=False)
+def _resolve_configured_api_key(key_name: str) -> str:
+    """Secrets/environment lookup, resolved once per process"""
+    # Priority 2: Streamlit secrets
+    if hasattr(st, 'secrets') and key_name in st.secrets:
+        return st.secrets[key_name]
+    
+    # Priority 3: Environment variables
+    env_key = os.getenv(key_name)
+    if env_key:
+        return env_key
+    
+    # Fallback keys for demo mode
+    return 'demo-key'
+
 class AdvancedConfig:
     @staticmethod
     def get_api_key(key_name: str) -> str:
@@ -62,118 +100,133 @@ class AdvancedConfig:
                 if user_key and user_key.strip():
                     return user_key.strip()
             
-            # Priority 2: Streamlit secrets
-            if hasattr(st, 'secrets') and key_name in st.secrets:
-                return st.secrets[key_name]
-            
-            # Priority 3: Environment variables
-            env_key = os.getenv(key_name)
-            if env_key:
-                return env_key
-            
-            # Fallback keys for demo mode
-            return 'demo-key'
+            return _resolve_configured_api_key(key_name)
             
         except Exception as e:
-            logger.error(f"Error retrieving API key {key_name}: {e}")
+            logger.error("Error retrieving API key %s: %s", key_name, e)
             return 'demo-key'
 
 # Advanced Geocoding Service for India
-@st.cache_data(ttl=3600)
+INDIAN_CITIES_DATA = MappingProxyType({
+    'mumbai': {'lat': 19.0760, 'lon': 72.8777, 'address': 'Mumbai, Maharashtra, India', 'state': 'Maharashtra'},
+    'delhi': {'lat': 28.7041, 'lon': 77.1025, 'address': 'New Delhi, Delhi, India', 'state': 'Delhi'},
+    'bangalore': {'lat': 12.9716, 'lon': 77.5946, 'address': 'Bangalore, Karnataka, India', 'state': 'Karnataka'},
+    'bengaluru': {'lat': 12.9716, 'lon': 77.5946, 'address': 'Bengaluru, Karnataka, India', 'state': 'Karnataka'},
+    'hyderabad': {'lat': 17.3850, 'lon': 78.4867, 'address': 'Hyderabad, Telangana, India', 'state': 'Telangana'},
+    'chennai': {'lat': 13.0827, 'lon': 80.2707, 'address': 'Chennai, Tamil Nadu, India', 'state': 'Tamil Nadu'},
+    'kolkata': {'lat': 22.5726, 'lon': 88.3639, 'address': 'Kolkata, West Bengal, India', 'state': 'West Bengal'},
+    'pune': {'lat': 18.5204, 'lon': 73.8567, 'address': 'Pune, Maharashtra, India', 'state': 'Maharashtra'},
+})
+
+# Single-pass matcher for city names embedded in free text (longest names first)
+CITY_NAME_PATTERN = re.compile('|'.join(
+    re.escape(city) for city in sorted(INDIAN_CITIES_DATA, key=len, reverse=True)
+))
+
+@st.cache_data(persist="disk", max_entries=256, show_spinner=False)
 def advanced_geocode(location: str) -> Optional[Dict]:
     """Enhanced geocoding with comprehensive Indian city database"""
     try:
-        indian_cities_data = {
-            'mumbai': {'lat': 19.0760, 'lon': 72.8777, 'address': 'Mumbai, Maharashtra, India', 'state': 'Maharashtra'},
-            'delhi': {'lat': 28.7041, 'lon': 77.1025, 'address': 'New Delhi, Delhi, India', 'state': 'Delhi'},
-            'bangalore': {'lat': 12.9716, 'lon': 77.5946, 'address': 'Bangalore, Karnataka, India', 'state': 'Karnataka'},
-            'bengaluru': {'lat': 12.9716, 'lon': 77.5946, 'address': 'Bengaluru, Karnataka, India', 'state': 'Karnataka'},
-            'hyderabad': {'lat': 17.3850, 'lon': 78.4867, 'address': 'Hyderabad, Telangana, India', 'state': 'Telangana'},
-            'chennai': {'lat': 13.0827, 'lon': 80.2707, 'address': 'Chennai, Tamil Nadu, India', 'state': 'Tamil Nadu'},
-            'kolkata': {'lat': 22.5726, 'lon': 88.3639, 'address': 'Kolkata, West Bengal, India', 'state': 'West Bengal'},
-            'pune': {'lat': 18.5204, 'lon': 73.8567, 'address': 'Pune, Maharashtra, India', 'state': 'Maharashtra'},
-        }
-        
         location_lower = location.lower().strip()
         
         # Direct match
-        if location_lower in indian_cities_data:
-            return indian_cities_data[location_lower]
+        if location_lower in INDIAN_CITIES_DATA:
+            return INDIAN_CITIES_DATA[location_lower]
+        
+        # Partial match: city name contained in the input
+        match = CITY_NAME_PATTERN.search(location_lower)
+        if match:
+            return INDIAN_CITIES_DATA[match.group(0)]
         
-        # Partial match
-        for city in indian_cities_data:
-            if city in location_lower or location_lower in city:
-                return indian_cities_data[city]
+        # Partial match: input is a fragment of a city name
+        for city in INDIAN_CITIES_DATA:
+            if location_lower in city:
+                return INDIAN_CITIES_DATA[city]
         
         # Default to Mumbai if not found
-        return indian_cities_data['mumbai']
+        return INDIAN_CITIES_DATA['mumbai']
         
     except Exception as e:
-        logger.error(f"Geocoding error: {e}")
+        logger.error("Geocoding error: %s", e)
         return {'lat': 19.0760, 'lon': 72.8777, 'address': 'Mumbai, Maharashtra, India', 'state': 'Maharashtra'}
 
+# Display colour per air-quality label
+AIR_QUALITY_COLORS = MappingProxyType({
+    'Good': '#4CAF50', 'Moderate': '#FF9800',
+    'Unhealthy for Sensitive Groups': '#FF5722',
+    'Unhealthy': '#F44336', 'Poor': '#9C27B0'
+})
+
+# Climate-zone base temperature by latitude: a latitude above bound i falls in zone i + 1
+LATITUDE_BOUNDS = (15, 20, 26, 30)
+ZONE_BASE_TEMPS = (
+    29.0,  # Coastal South
+    27.0,  # Southern plateau
+    30.0,  # Central India
+    25.0,  # Northern plains
+    15.0,  # Northern mountains (Himalayas)
+)
+
+# Season per calendar month (index 0 unused)
+SEASON_BY_MONTH = (
+    '', 'Winter', 'Winter', 'Summer', 'Summer', 'Summer', 'Monsoon',
+    'Monsoon', 'Monsoon', 'Monsoon', 'Post-Monsoon', 'Post-Monsoon', 'Winter'
+)
+
+# Per-season temperature offset, humidity range and sky conditions
+SEASON_TEMP_DELTAS = MappingProxyType({'Winter': -5, 'Summer': 8, 'Monsoon': -2, 'Post-Monsoon': 0})
+DRY_HUMIDITY_RANGE = (45, 71)
+MONSOON_HUMIDITY_RANGE = (60, 86)
+DRY_CONDITIONS = ('clear sky', 'partly cloudy', 'scattered clouds', 'hazy')
+MONSOON_CONDITIONS = ('light rain', 'moderate rain', 'overcast')
+AIR_QUALITY_LEVELS = tuple(AIR_QUALITY_COLORS)
+
 # Advanced Weather Data with Indian Context
-@st.cache_data(ttl=1800)
+WEATHER_TTL_SECONDS = 1800
+
+@st.cache_data(ttl=WEATHER_TTL_SECONDS, max_entries=256, show_spinner=False)
 def get_advanced_weather(lat: float, lon: float) -> Dict:
     """Enhanced weather data with Indian climate patterns"""
     try:
-        # Base temperature calculation based on Indian geography
-        base_temp = 28.0  # Indian average
-        
-        # Latitude-based adjustments for Indian climate zones
-        if lat > 30:  # Northern mountains (Himalayas)
-            base_temp = 15.0
-        elif lat > 26:  # Northern plains
-            base_temp = 25.0
-        elif lat > 20:  # Central India
-            base_temp = 30.0
-        elif lat > 15:  # Southern plateau
-            base_temp = 27.0
-        else:  # Coastal South
-            base_temp = 29.0
-        
-        # Seasonal adjustments (simplified)
-        current_month = datetime.now().month
-        if current_month in [12, 1, 2]:  # Winter
-            base_temp -= 5
-        elif current_month in [3, 4, 5]:  # Summer
-            base_temp += 8
-        elif current_month in [6, 7, 8, 9]:  # Monsoon
-            base_temp -= 2
-        
-        # Add realistic variation
-        temp_variation = random.uniform(-3, 4)
+        # Seeded per location and cache window, so readings only change when the TTL would
+        rng = seeded_rng('weather', round(lat, 3), round(lon, 3), int(time.time() // WEATHER_TTL_SECONDS))
+        
+        # Base temperature from the climate zone, adjusted for the season
+        season = SEASON_BY_MONTH[time.localtime().tm_mon]
+        monsoon = season == 'Monsoon'
+        base_temp = ZONE_BASE_TEMPS[bisect_left(LATITUDE_BOUNDS, lat)] + SEASON_TEMP_DELTAS[season]
+        
+        # Add realistic variation (all continuous / integer variates drawn in one batch each)
+        temp_variation, feels_offset, wind_speed = rng.uniform((-3, -2, 3), (4, 4, 15)).tolist()
         current_temp = base_temp + temp_variation
         
         # Generate realistic Indian weather data
-        humidity = random.randint(60, 85) if current_month in [6, 7, 8, 9] else random.randint(45, 70)
+        humidity_range = MONSOON_HUMIDITY_RANGE if monsoon else DRY_HUMIDITY_RANGE
+        humidity, pressure, uv_index, visibility = rng.integers(
+            (humidity_range[0], 1008, 1, 5), (humidity_range[1], 1019, 12, 16)
+        ).tolist()
         
-        weather_conditions = ['clear sky', 'partly cloudy', 'scattered clouds', 'hazy']
-        
-        if current_month in [6, 7, 8, 9]:  # Monsoon season
-            description = random.choice(['light rain', 'moderate rain', 'overcast'])
-        else:
-            description = random.choice(weather_conditions)
+        description_pool = MONSOON_CONDITIONS if monsoon else DRY_CONDITIONS
+        description = description_pool[rng.integers(len(description_pool))]
         
         # Air quality based on Indian cities
-        aqi_levels = ['Good', 'Moderate', 'Unhealthy for Sensitive Groups', 'Unhealthy', 'Poor']
-        air_quality = random.choice(aqi_levels)
+        air_quality = AIR_QUALITY_LEVELS[rng.integers(len(AIR_QUALITY_LEVELS))]
         
         return {
             'temperature': round(current_temp, 1),
             'humidity': humidity,
-            'pressure': random.randint(1008, 1018),
+            'pressure': pressure,
             'description': description,
-            'feels_like': round(current_temp + random.uniform(-2, 4), 1),
-            'wind_speed': round(random.uniform(3, 15), 1),
+            'feels_like': round(current_temp + feels_offset, 1),
+            'wind_speed': round(wind_speed, 1),
             'air_quality': air_quality,
-            'uv_index': random.randint(1, 11),
-            'visibility': random.randint(5, 15),
-            'season': 'Monsoon' if current_month in [6, 7, 8, 9] else 'Winter' if current_month in [12, 1, 2] else 'Summer' if current_month in [3, 4, 5] else 'Post-Monsoon'
+            'uv_index': uv_index,
+            'visibility': visibility,
+            'season': season
         }
         
     except Exception as e:
-        logger.error(f"Weather data error: {e}")
+        logger.error("Weather data error: %s", e)
         return {
             'temperature': 28.0, 'humidity': 65, 'pressure': 1013,
             'description': 'partly cloudy', 'feels_like': 30.0,
@@ -182,12 +235,108 @@ def get_advanced_weather(lat: float, lon: float) -> Dict:
         }
 
 # OpenAI Integration
+OPENAI_SYSTEM_PROMPT = string.Template("""You are MediAI Pro, an advanced AI medical assistant for Indian healthcare.
+Provide comprehensive, culturally sensitive medical information considering Indian healthcare system,
+medical practices, dietary patterns, and integration of Ayurveda with modern medicine.
+
+ANALYSIS TYPE: $analysis_type
+Always emphasize consulting qualified healthcare professionals.""")
+
+# Static guidance sections shared by every demo response
+DEMO_RESPONSE_GUIDANCE = """### 🌿 Traditional Indian Medicine Integration
+**Ayurvedic Approach:**
+- Include turmeric, ginger, and garlic in daily diet
+- Practice pranayama breathing exercises for 15 minutes daily
+- Consider consultation with qualified AYUSH practitioner
+
+### 🏥 Healthcare Navigation in India
+**Immediate Care Options:**
+- Government hospitals: Free emergency care available
+- Private hospitals: Faster service, higher costs
+- Telemedicine: eSanjeevani for consultations
+
+### 💊 Medication Guidance
+**Cost-Effective Options:**
+- Jan Aushadhi stores: 90% cheaper generic medicines
+- Generic alternatives for all branded medications
+- Insurance utilization through Ayushman Bharat
+
+### 🚨 Emergency Protocols
+**Important Numbers:**
+- National Emergency: 112
+- Medical Emergency: 108
+- Ambulance: 102
+
+### ⚠️ Medical Disclaimer
+This analysis is for educational purposes only. Always consult qualified healthcare professionals 
+registered with Medical Council of India (MCI) for diagnosis and treatment.
+
+---
+*Generated by MediAI Pro - Advanced AI Health Assistant for India*"""
+
+# Demo response body; the static guidance is folded in once at import
+DEMO_RESPONSE_TEMPLATE = string.Template("""# 🏥 $analysis_type - MediAI Pro India
+
+## 📊 Patient Overview
+**Name:** $name | **Age:** $age years | **Gender:** $gender
+
+## 🩺 Health Assessment Summary
+Based on your comprehensive health data, here's your personalized analysis:
+
+### 🫀 Cardiovascular Health
+- **Blood Pressure:** $bp_systolic/$bp_diastolic mmHg
+- **Status:** $bp_status
+- **Recommendation:** Regular monitoring, consider DASH diet with Indian modifications
+
+""" + DEMO_RESPONSE_GUIDANCE)
+
+def format_demo_response(analysis_type: str, name: str, age: int, gender: str,
+                         bp_systolic: int, bp_diastolic: int) -> str:
+    """Demo analysis markdown for one patient summary"""
+    return DEMO_RESPONSE_TEMPLATE.substitute(
+        analysis_type=analysis_type, name=name, age=age, gender=gender,
+        bp_systolic=bp_systolic, bp_diastolic=bp_diastolic,
+        bp_status='Normal' if bp_systolic < 140 else 'Needs attention'
+    )
+
+class AnalysisStream:
+    """Iterable analysis chunks; `live` is set once a complete OpenAI answer has streamed"""
+    
+    def __init__(self, service: 'AdvancedAIService', prompt: str, patient_data: Dict, analysis_type: str, api_key: str):
+        self.service = service
+        self.prompt = prompt
+        self.patient_data = patient_data
+        self.analysis_type = analysis_type
+        self.api_key = api_key
+        self.live = False
+    
+    def __iter__(self) -> Iterator[str]:
+        service = self.service
+        if service.is_live_key(self.api_key):
+            streamed = False
+            try:
+                for token in service._stream_openai_response(self.prompt, self.patient_data, self.analysis_type, self.api_key):
+                    streamed = True
+                    yield token
+                self.live = True
+                return
+            except Exception as e:
+                logger.error("OpenAI streaming error: %s", e)
+                # Keep a partial answer rather than appending the demo text to it
+                if streamed:
+                    return
+        
+        demo_response = service._get_advanced_demo_response(self.analysis_type, self.patient_data)
+        for paragraph in demo_response.split('\n\n'):
+            yield paragraph + '\n\n'
+
 class AdvancedAIService:
     def __init__(self):
         self.base_url = "https://api.openai.com/v1/chat/completions"
         self.model = "gpt-3.5-turbo"
         self.max_tokens = 2000
         self.temperature = 0.7
+        self.session = get_http_session()
     
     def get_api_key(self) -> str:
         """Get API key with priority for user input"""
@@ -197,41 +346,29 @@ class AdvancedAIService:
                 return user_key.strip()
         return AdvancedConfig.get_api_key('OPENAI_API_KEY')
     
-    def is_api_available(self) -> bool:
-        """Check if real OpenAI API is available"""
-        api_key = self.get_api_key()
-        return api_key and api_key != 'demo-key' and api_key.startswith('sk-')
+    @staticmethod
+    def is_live_key(api_key: str) -> bool:
+        """True for a real OpenAI key rather than the demo placeholder"""
+        return bool(api_key) and api_key != 'demo-key' and api_key.startswith('sk-')
     
-    def get_health_analysis_sync(self, prompt: str, patient_data: Dict, analysis_type: str) -> str:
-        """Synchronous version for Streamlit compatibility"""
-        api_key = self.get_api_key()
-        
-        if self.is_api_available():
-            try:
-                return self._get_openai_response_sync(prompt, patient_data, analysis_type, api_key)
-            except Exception as e:
-                logger.error(f"OpenAI API error: {e}")
-                return self._get_advanced_demo_response(analysis_type, patient_data)
-        else:
-            return self._get_advanced_demo_response(analysis_type, patient_data)
+    def stream_health_analysis(self, prompt: str, patient_data: Dict, analysis_type: str, api_key: str) -> 'AnalysisStream':
+        """Analysis text for st.write_stream: live tokens from OpenAI, or the demo response by paragraph"""
+        return AnalysisStream(self, prompt, patient_data, analysis_type, api_key)
     
-    def _get_openai_response_sync(self, prompt: str, patient_data: Dict, analysis_type: str, api_key: str) -> str:
-        """Get response from OpenAI API"""
-        system_message = f"""You are MediAI Pro, an advanced AI medical assistant for Indian healthcare. 
-        Provide comprehensive, culturally sensitive medical information considering Indian healthcare system, 
-        medical practices, dietary patterns, and integration of Ayurveda with modern medicine.
-        
-        ANALYSIS TYPE: {analysis_type}
-        Always emphasize consulting qualified healthcare professionals."""
+    def _build_request(self, prompt: str, patient_data: Dict, analysis_type: str, api_key: str) -> Tuple[Dict, Dict]:
+        """Headers and chat-completion payload for one analysis"""
+        system_message = OPENAI_SYSTEM_PROMPT.substitute(analysis_type=analysis_type)
 
         headers = {
             'Authorization': f'Bearer {api_key}',
             'Content-Type': 'application/json'
         }
         
+        # Compact JSON keeps the prompt (and token bill) small; numpy scalars serialize natively
+        patient_json = orjson.dumps(patient_data, default=str, option=orjson.OPT_SERIALIZE_NUMPY).decode()
         messages = [
             {"role": "system", "content": system_message},
-            {"role": "user", "content": f"{prompt}\n\nPatient Data: {json.dumps(patient_data, default=str, indent=2)}"}
+            {"role": "user", "content": f"{prompt}\n\nPatient Data: {patient_json}"}
         ]
         
         payload = {
@@ -240,202 +377,280 @@ class AdvancedAIService:
             "temperature": self.temperature,
             "max_tokens": self.max_tokens
         }
-        
-        response = requests.post(self.base_url, headers=headers, json=payload, timeout=45)
-        
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        else:
-            raise Exception(f"OpenAI API error: {response.status_code}")
+        return headers, payload
+    
+    def _stream_openai_response(self, prompt: str, patient_data: Dict, analysis_type: str, api_key: str) -> Iterator[str]:
+        """Yield completion tokens from the OpenAI server-sent event stream"""
+        headers, payload = self._build_request(prompt, patient_data, analysis_type, api_key)
+        payload["stream"] = True
+        
+        # The read timeout applies between chunks, not to the whole completion
+        with self.session.post(self.base_url, headers=headers, data=orjson.dumps(payload),
+                               timeout=(3.05, 45), stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(f"OpenAI API error: {response.status_code}")
+            
+            for line in response.iter_lines():
+                if not line.startswith(b'data: '):
+                    continue
+                data = line[6:]
+                if data == b'[DONE]':
+                    break
+                content = orjson.loads(data)['choices'][0]['delta'].get('content')
+                if content:
+                    yield content
     
     def _get_advanced_demo_response(self, analysis_type: str, patient_data: Dict) -> str:
         """Advanced demo responses with Indian healthcare context"""
-        patient_info = patient_data.get('patient', {})
-        vitals = patient_data.get('vitals', {})
-        age = patient_info.get('age', 30)
-        gender = patient_info.get('gender', 'Unknown')
+        patient_info = patient_data.get('patient') or {}
+        vitals = patient_data.get('vitals') or {}
+        name, age, gender = patient_info.get('name', 'Patient'), patient_info.get('age', 30), patient_info.get('gender', 'Unknown')
+        bp_systolic, bp_diastolic = vitals.get('bp_systolic', 120), vitals.get('bp_diastolic', 80)
         
-        return f"""# 🏥 {analysis_type} - MediAI Pro India
+        return format_demo_response(analysis_type, name, age, gender, bp_systolic, bp_diastolic)
 
-## 📊 Patient Overview
-**Name:** {patient_info.get('name', 'Patient')} | **Age:** {age} years | **Gender:** {gender}
+# Medical Facilities Service
+@dataclass(frozen=True, slots=True)
+class FacilityTemplate:
+    name: str
+    rating: float
+    base_distance: float
+    specialty: str
+    type: str = 'Private'
+    beds: int = 0  # 0 = not recorded, a plausible count is generated per search
 
-## 🩺 Health Assessment Summary
-Based on your comprehensive health data, here's your personalized analysis:
+MEDICAL_FACILITIES_DATA = MappingProxyType({
+    'hospital': (
+        FacilityTemplate('AIIMS Delhi', 4.8, 5.0, 'Super Specialty', 'Government', 2478),
+        FacilityTemplate('Apollo Hospital', 4.6, 3.2, 'Multi-specialty', 'Private', 500),
+        FacilityTemplate('Fortis Healthcare', 4.4, 6.8, 'Integrated Healthcare', 'Private', 400),
+        FacilityTemplate('Max Healthcare', 4.5, 9.1, 'Super Specialty', 'Private', 600),
+        FacilityTemplate('Government General Hospital', 4.0, 7.5, 'General Medicine', 'Government', 800),
+    ),
+    'pharmacy': (
+        FacilityTemplate('Apollo Pharmacy', 4.3, 0.8, '24x7 Medicine', 'Chain'),
+        FacilityTemplate('MedPlus Health Services', 4.1, 1.2, 'Generic Medicines', 'Chain'),
+        FacilityTemplate('Jan Aushadhi Store', 4.4, 2.4, '90% Cheaper Generics', 'Government'),
+        FacilityTemplate('City Medical Store', 4.0, 3.6, 'Family Pharmacy', 'Independent'),
+        FacilityTemplate('Wellness Pharmacy', 3.9, 4.2, 'Health Products', 'Independent'),
+    ),
+})
 
-### 🫀 Cardiovascular Health
-- **Blood Pressure:** {vitals.get('bp_systolic', 120)}/{vitals.get('bp_diastolic', 80)} mmHg
-- **Status:** {'Normal' if vitals.get('bp_systolic', 120) < 140 else 'Needs attention'}
-- **Recommendation:** Regular monitoring, consider DASH diet with Indian modifications
+# Operating hours keyed by (facility type, category), with a per-type fallback
+FACILITY_HOURS = MappingProxyType({
+    ('hospital', 'Government'): '24x7 Emergency | OPD: Mon-Sat 8 AM - 2 PM',
+    ('pharmacy', 'Chain'): 'Mon-Sun: 7 AM - 11 PM | Emergency: 24x7',
+    ('pharmacy', 'Government'): 'Mon-Fri: 9 AM - 5 PM | Sat: 9 AM - 1 PM',
+})
+FACILITY_DEFAULT_HOURS = MappingProxyType({
+    'hospital': '24x7 All Services | OPD: Mon-Sun 6 AM - 10 PM',
+    'pharmacy': 'Mon-Sun: 8 AM - 10 PM',
+})
 
-### 🌿 Traditional Indian Medicine Integration
-**Ayurvedic Approach:**
-- Include turmeric, ginger, and garlic in daily diet
-- Practice pranayama breathing exercises for 15 minutes daily
-- Consider consultation with qualified AYUSH practitioner
+FACILITY_INSURANCE_ACCEPTED = ('Ayushman Bharat', 'CGHS', 'ESI', 'Mediclaim')
+FACILITY_LANGUAGES = ('Hindi', 'English', 'Local Language')
+format_facility_address = "Medical Area, {} Complex, City - {:.1f}km".format
+format_facility_phone = "+91-{}-{}-{}".format
 
-### 🏥 Healthcare Navigation in India
-**Immediate Care Options:**
-- Government hospitals: Free emergency care available
-- Private hospitals: Faster service, higher costs
-- Telemedicine: eSanjeevani for consultations
-
-### 💊 Medication Guidance
-**Cost-Effective Options:**
-- Jan Aushadhi stores: 90% cheaper generic medicines
-- Generic alternatives for all branded medications
-- Insurance utilization through Ayushman Bharat
-
-### 🚨 Emergency Protocols
-**Important Numbers:**
-- National Emergency: 112
-- Medical Emergency: 108
-- Ambulance: 102
-
-### ⚠️ Medical Disclaimer
-This analysis is for educational purposes only. Always consult qualified healthcare professionals 
-registered with Medical Council of India (MCI) for diagnosis and treatment.
+@st.cache_resource
+def get_facility_catalogue() -> Dict[str, pd.DataFrame]:
+    """Column-oriented (SoA) facility catalogue per type, built once per process"""
+    return {
+        facility_type: pd.DataFrame([asdict(facility) for facility in facilities])
+        for facility_type, facilities in MEDICAL_FACILITIES_DATA.items()
+    }
 
----
-*Generated by MediAI Pro - Advanced AI Health Assistant for India*"""
+# Degrees of latitude per km of north-south distance
+DEG_PER_KM = 1 / 111.32
 
-# Medical Facilities Service
 class IndianMedicalFacilitiesService:
-    def search_facilities(self, lat: float, lon: float, facility_type: str = "hospital", radius: int = 100000) -> List[Dict]:
+    def search_facilities(self, lat: float, lon: float, facility_type: str = "hospital", radius: int = 100000,
+                          limit: Optional[int] = None) -> List[Dict]:
         """Enhanced facilities search"""
         try:
-            facilities_data = {
-                'hospital': [
-                    {'name': 'AIIMS Delhi', 'rating': 4.8, 'base_distance': 5.0, 'specialty': 'Super Specialty', 'type': 'Government', 'beds': 2478},
-                    {'name': 'Apollo Hospital', 'rating': 4.6, 'base_distance': 3.2, 'specialty': 'Multi-specialty', 'type': 'Private', 'beds': 500},
-                    {'name': 'Fortis Healthcare', 'rating': 4.4, 'base_distance': 6.8, 'specialty': 'Integrated Healthcare', 'type': 'Private', 'beds': 400},
-                    {'name': 'Max Healthcare', 'rating': 4.5, 'base_distance': 9.1, 'specialty': 'Super Specialty', 'type': 'Private', 'beds': 600},
-                    {'name': 'Government General Hospital', 'rating': 4.0, 'base_distance': 7.5, 'specialty': 'General Medicine', 'type': 'Government', 'beds': 800},
-                ],
-                'pharmacy': [
-                    {'name': 'Apollo Pharmacy', 'rating': 4.3, 'base_distance': 0.8, 'specialty': '24x7 Medicine', 'type': 'Chain'},
-                    {'name': 'MedPlus Health Services', 'rating': 4.1, 'base_distance': 1.2, 'specialty': 'Generic Medicines', 'type': 'Chain'},
-                    {'name': 'Jan Aushadhi Store', 'rating': 4.4, 'base_distance': 2.4, 'specialty': '90% Cheaper Generics', 'type': 'Government'},
-                    {'name': 'City Medical Store', 'rating': 4.0, 'base_distance': 3.6, 'specialty': 'Family Pharmacy', 'type': 'Independent'},
-                    {'name': 'Wellness Pharmacy', 'rating': 3.9, 'base_distance': 4.2, 'specialty': 'Health Products', 'type': 'Independent'},
-                ]
-            }
+            catalogue = get_facility_catalogue().get(facility_type)
+            if catalogue is None:
+                return []
             
-            facilities = facilities_data.get(facility_type, [])
+            # Seeded per rounded location so a cache miss reproduces the same list
+            rng = seeded_rng('facilities', round(lat, 3), round(lon, 3), facility_type, radius)
             radius_km = radius / 1000
+            nearby = catalogue[catalogue['base_distance'] <= radius_km]
+            n = len(nearby)
+            
+            # Add realistic variation (one batched draw per column)
+            distance_variation = rng.uniform(-0.5, 0.5, n)
+            actual_distance = np.maximum(0.1, nearby['base_distance'].to_numpy() + distance_variation)
+            distance = np.round(actual_distance, 2)
             
-            result_facilities = []
-            for facility in facilities:
-                if facility['base_distance'] <= radius_km:
-                    # Add realistic variation
-                    distance_variation = random.uniform(-0.5, 0.5)
-                    actual_distance = max(0.1, facility['base_distance'] + distance_variation)
-                    
-                    # Calculate coordinates
-                    lat_offset = (actual_distance / 111.32) * random.choice([-1, 1])
-                    lon_offset = (actual_distance / (111.32 * math.cos(math.radians(lat)))) * random.choice([-1, 1])
-                    
-                    facility_info = {
-                        'name': facility['name'],
-                        'rating': facility['rating'] + random.uniform(-0.2, 0.2),
-                        'user_ratings_total': random.randint(50, 2000),
-                        'address': f"Medical Area, {facility['name']} Complex, City - {actual_distance:.1f}km",
-                        'status': 'OPERATIONAL',
-                        'lat': lat + lat_offset,
-                        'lng': lon + lon_offset,
-                        'distance': round(actual_distance, 2),
-                        'specialty': facility['specialty'],
-                        'phone': f"+91-{random.randint(11,99)}-{random.randint(2000,9999)}-{random.randint(1000,9999)}",
-                        'type': facility.get('type', 'Private'),
-                        'beds': facility.get('beds', random.randint(50, 300)),
-                        'hours': self._get_hours(facility_type, facility.get('type', 'Private')),
-                        'emergency': facility_type == 'hospital',
-                        'insurance_accepted': ['Ayushman Bharat', 'CGHS', 'ESI', 'Mediclaim'],
-                        'languages': ['Hindi', 'English', 'Local Language']
-                    }
-                    result_facilities.append(facility_info)
+            # Calculate coordinates (degrees per km for lat and lon, broadcast over both columns)
+            signs = rng.choice((-1, 1), size=(n, 2))
+            deg_per_km = np.array((DEG_PER_KM, DEG_PER_KM / math.cos(math.radians(lat))))
+            lat_offset, lon_offset = (actual_distance[:, None] * deg_per_km * signs).T
             
-            # Sort by distance
-            result_facilities.sort(key=lambda x: x['distance'])
-            return result_facilities
+            rating = nearby['rating'].to_numpy() + rng.uniform(-0.2, 0.2, n)
+            beds = nearby['beds'].to_numpy()
+            beds = np.where(beds > 0, beds, rng.integers(50, 301, n))
+            user_ratings_total = rng.integers(50, 2001, n)
+            phone_parts = rng.integers((11, 2000, 1000), (100, 10000, 10000), size=(n, 3))
+            
+            # Sort by distance (only the nearest `limit` rows when capped), then materialize dicts for those
+            if limit is not None and limit < n:
+                order = np.argpartition(distance, limit - 1)[:limit] if limit > 0 else np.arange(0)
+                order = order[np.argsort(distance[order], kind='stable')]
+            else:
+                order = np.argsort(distance, kind='stable')
+            names = nearby['name'].to_numpy()[order].tolist()
+            addresses = list(map(format_facility_address, names, actual_distance[order].tolist()))
+            phones = [format_facility_phone(*parts) for parts in phone_parts[order].tolist()]
+            rows = zip(
+                names,
+                rating[order].tolist(),
+                addresses,
+                distance[order].tolist(),
+                (lat + lat_offset[order]).tolist(),
+                (lon + lon_offset[order]).tolist(),
+                nearby['specialty'].to_numpy()[order].tolist(),
+                nearby['type'].to_numpy()[order].tolist(),
+                beds[order].tolist(),
+                user_ratings_total[order].tolist(),
+                phones,
+            )
+            
+            return [
+                {
+                    'name': name,
+                    'rating': facility_rating,
+                    'user_ratings_total': ratings_total,
+                    'address': address,
+                    'status': 'OPERATIONAL',
+                    'lat': facility_lat,
+                    'lng': facility_lng,
+                    'distance': facility_distance,
+                    'specialty': specialty,
+                    'phone': phone,
+                    'type': category,
+                    'beds': facility_beds,
+                    'hours': self._get_hours(facility_type, category),
+                    'emergency': facility_type == 'hospital',
+                    'insurance_accepted': list(FACILITY_INSURANCE_ACCEPTED),
+                    'languages': list(FACILITY_LANGUAGES)
+                }
+                for (name, facility_rating, address, facility_distance,
+                     facility_lat, facility_lng, specialty, category, facility_beds,
+                     ratings_total, phone) in rows
+            ]
             
         except Exception as e:
-            logger.error(f"Facilities search error: {e}")
+            logger.error("Facilities search error: %s", e)
             return []
     
+    def search_nearby(self, lat: float, lon: float, facility_types: Tuple[str, ...] = ("hospital", "pharmacy"),
+                      limit: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """Search each facility type in turn (in-memory and CPU-bound, so threads would not help)"""
+        return {
+            facility_type: self.search_facilities(lat, lon, facility_type, limit=limit)
+            for facility_type in facility_types
+        }
+    
     def _get_hours(self, facility_type: str, facility_category: str) -> str:
         """Generate operating hours"""
-        if facility_type == 'hospital':
-            if facility_category == 'Government':
-                return '24x7 Emergency | OPD: Mon-Sat 8 AM - 2 PM'
-            else:
-                return '24x7 All Services | OPD: Mon-Sun 6 AM - 10 PM'
-        else:  # pharmacy
-            if facility_category == 'Chain':
-                return 'Mon-Sun: 7 AM - 11 PM | Emergency: 24x7'
-            elif facility_category == 'Government':
-                return 'Mon-Fri: 9 AM - 5 PM | Sat: 9 AM - 1 PM'
-            else:
-                return 'Mon-Sun: 8 AM - 10 PM'
+        schedule = 'hospital' if facility_type == 'hospital' else 'pharmacy'
+        return FACILITY_HOURS.get((schedule, facility_category), FACILITY_DEFAULT_HOURS[schedule])
+
+# Service singletons (constructed once per process, not on every rerun)
+@st.cache_resource
+def get_ai_service() -> AdvancedAIService:
+    return AdvancedAIService()
+
+@st.cache_resource
+def get_facilities_service() -> IndianMedicalFacilitiesService:
+    return IndianMedicalFacilitiesService()
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def get_nearby_facilities(lat: float, lon: float, limit: Optional[int] = None) -> Dict[str, List[Dict]]:
+    """Hospitals and pharmacies around a point; callers round coordinates to ~100 m"""
+    return get_facilities_service().search_nearby(lat, lon, limit=limit)
 
 # Health Analytics
+# Risk rules as (bit, risk factor, recommendation, score penalty); bit order matches _score_kernel
+HEALTH_RISK_RULES = (
+    (1 << 0, "Underweight", "Nutritional counseling", 15),
+    (1 << 1, "Obesity (Indian BMI standards)", "Weight management", 20),
+    (1 << 2, "Hypertension", "Medical consultation required", 25),
+    (1 << 3, "Sedentary lifestyle", "Start daily exercise routine", 20),
+)
+
+# Score tiers: Poor < 55 <= Fair < 70 <= Good < 85 <= Excellent
+HEALTH_SCORE_BOUNDS = (55, 70, 85)
+HEALTH_SCORE_TIERS = (
+    ("Poor", "#F44336", "Lifestyle improvements recommended"),
+    ("Fair", "#FF9800", "Lifestyle improvements recommended"),
+    ("Good", "#8BC34A", "Continue healthy lifestyle"),
+    ("Excellent", "#4CAF50", "Continue healthy lifestyle"),
+)
+
+# Score for every combination of risk bits, so the kernel needs no penalty loop
+HEALTH_SCORE_BY_RISK_BITS = tuple(
+    100 - sum(penalty for bit, _, _, penalty in HEALTH_RISK_RULES if mask & bit)
+    for mask in range(1 << len(HEALTH_RISK_RULES))
+)
+
+def _score_kernel(bmi: float, bp_sys: float, bp_dia: float, sedentary: bool) -> Tuple[int, int]:
+    """Pure numeric scoring core: returns (score, risk_bits) from primitive inputs"""
+    # Each comparison is one bit: underweight, obese (lower Indian threshold), hypertension, sedentary
+    risk_bits = (
+        (bmi < 18.5)
+        | (bmi > 27) << 1
+        | ((bp_sys > 140) | (bp_dia > 90)) << 2
+        | bool(sedentary) << 3
+    )
+    return HEALTH_SCORE_BY_RISK_BITS[risk_bits], int(risk_bits)
+
+# BMI bands (WHO Asian guidelines): Underweight < 18.5 <= Normal < 23.0 <= Overweight
+BMI_BOUNDS = (18.5, 23.0)
+BMI_CATEGORIES = ("Underweight", "Normal", "Overweight")
+BMI_COLORS = ("#FF9800", "#4CAF50", "#FF9800")
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def bmi_bundle(weight: float, height_cm: float) -> Tuple[float, str, str]:
+    """BMI with its category and display colour"""
+    height_m = height_cm / 100
+    bmi = weight / (height_m ** 2)
+    band = bisect_right(BMI_BOUNDS, bmi)
+    return bmi, BMI_CATEGORIES[band], BMI_COLORS[band]
+
+# Exercise frequency options; the first two count as a sedentary lifestyle
+EXERCISE_FREQUENCIES = ("Never", "Rarely (less than once/week)", "1-2 times/week", "3-4 times/week", "5+ times/week")
+SEDENTARY_FREQUENCIES = frozenset(EXERCISE_FREQUENCIES[:2])
+
 class AdvancedHealthAnalytics:
     @staticmethod
     def calculate_indian_health_score(vitals: Dict, bmi: float, age: int, symptoms: str, lifestyle: Dict) -> Dict:
         """Advanced health scoring with Indian health parameters"""
         try:
-            score = 100
-            risk_factors = []
-            recommendations = []
-            
-            # BMI Assessment with Indian standards
-            if bmi < 18.5:
-                score -= 15
-                risk_factors.append("Underweight")
-                recommendations.append("Nutritional counseling")
-            elif bmi > 27:  # Lower threshold for Indians
-                score -= 20
-                risk_factors.append("Obesity (Indian BMI standards)")
-                recommendations.append("Weight management")
-            
-            # Blood Pressure
-            bp_sys = vitals.get('bp_systolic', 120)
-            bp_dia = vitals.get('bp_diastolic', 80)
-            
-            if bp_sys > 140 or bp_dia > 90:
-                score -= 25
-                risk_factors.append("Hypertension")
-                recommendations.append("Medical consultation required")
-            
-            # Lifestyle factors
             exercise_freq = lifestyle.get('exercise_frequency', 'Rarely')
-            if exercise_freq in ['Never', 'Rarely (less than once/week)']:
-                score -= 20
-                risk_factors.append("Sedentary lifestyle")
-                recommendations.append("Start daily exercise routine")
+            score, risk_bits = _score_kernel(
+                bmi,
+                vitals.get('bp_systolic', 120),
+                vitals.get('bp_diastolic', 80),
+                exercise_freq in SEDENTARY_FREQUENCIES
+            )
+            
+            risk_factors = [risk for bit, risk, _, _ in HEALTH_RISK_RULES if risk_bits & bit]
+            recommendations = [rec for bit, _, rec, _ in HEALTH_RISK_RULES if risk_bits & bit]
             
             score = max(0, min(100, score))
             
             # Health status
-            if score >= 85:
-                status = "Excellent"
-                color = "#4CAF50"
-            elif score >= 70:
-                status = "Good" 
-                color = "#8BC34A"
-            elif score >= 55:
-                status = "Fair"
-                color = "#FF9800"
-            else:
-                status = "Poor"
-                color = "#F44336"
+            status, color, advice = HEALTH_SCORE_TIERS[bisect_right(HEALTH_SCORE_BOUNDS, score)]
             
             return {
                 'score': score,
                 'status': status,
                 'color': color,
                 'message': f"Your health score is {score}/100 - {status}",
-                'advice': "Continue healthy lifestyle" if score >= 70 else "Lifestyle improvements recommended",
+                'advice': advice,
                 'risk_factors': risk_factors,
                 'recommendations': recommendations,
                 'indian_specific_risks': ["Air pollution exposure", "Dietary salt intake"],
@@ -443,7 +658,7 @@ class AdvancedHealthAnalytics:
             }
             
         except Exception as e:
-            logger.error(f"Health score calculation error: {e}")
+            logger.error("Health score calculation error: %s", e)
             return {
                 'score': 75, 'status': 'Good', 'color': '#8BC34A',
                 'message': 'Health assessment completed.',
@@ -452,100 +667,168 @@ class AdvancedHealthAnalytics:
                 'indian_specific_risks': [], 'insurance_recommendations': []
             }
 
-# Main Application
-def main():
-    # CSS Styling
-    st.markdown("""
-    <style>
-        .main {
-            font-family: 'Arial', sans-serif;
-            background: linear-gradient(135deg, #FFF7F0 0%, #F8F9FA 100%);
-        }
-        
-        .metric-card {
-            background: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            margin: 1rem 0;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-            border-left: 4px solid #007C91;
-        }
-        
-        .weather-card {
-            background: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            margin: 1rem 0;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-            text-align: center;
-        }
-        
-        .facility-card {
-            background: white;
-            border-radius: 12px;
-            padding: 1.5rem;
-            margin: 1rem 0;
-            border-left: 4px solid #007C91;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        
-        .emergency-alert {
-            background: linear-gradient(45deg, #F44336, #E91E63);
-            color: white;
-            padding: 2rem;
-            border-radius: 15px;
-            margin: 1.5rem 0;
-            animation: pulse 2s infinite;
-        }
-        
-        @keyframes pulse {
-            0% { box-shadow: 0 0 0 rgba(244, 67, 54, 0.7); }
-            70% { box-shadow: 0 0 0 10px rgba(244, 67, 54, 0); }
-            100% { box-shadow: 0 0 0 rgba(244, 67, 54, 0); }
-        }
-        
-        .success-message {
-            background: linear-gradient(45deg, #4CAF50, #8BC34A);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 12px;
-            margin: 1rem 0;
-        }
-        
-        .warning-message {
-            background: linear-gradient(45deg, #FF9800, #FFA726);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 12px;
-            margin: 1rem 0;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    # Header
-    st.markdown("<h1 style='text-align: center; color: #007C91; margin-bottom: 2rem;'>🏥 MediAI Pro - भारत का स्वास्थ्य सहायक</h1>", unsafe_allow_html=True)
-    st.markdown("<p style='text-align: center; font-size: 1.2rem; color: #666; margin-bottom: 2rem;'>Advanced AI-Powered Healthcare Assistant for India</p>", unsafe_allow_html=True)
-    
-    # Initialize session state
-    if 'user_location' not in st.session_state:
-        st.session_state.user_location = None
-    if 'coordinates' not in st.session_state:
-        st.session_state.coordinates = None
-    if 'health_data' not in st.session_state:
-        st.session_state.health_data = {}
-    if 'location_set' not in st.session_state:
-        st.session_state.location_set = False
-    
-    # Initialize services
-    ai_service = AdvancedAIService()
-    facilities_service = IndianMedicalFacilitiesService()
+# Sample health news headlines (static until a news feed is wired in)
+HEALTH_NEWS_ITEMS = (
+    "🇮🇳 AIIMS launches new telemedicine services across rural India",
+    "💊 Jan Aushadhi scheme reaches 8,000 stores nationwide",
+    "🌿 New Ayurveda research shows promising results for diabetes",
+    "🏥 Government announces expansion of Ayushman Bharat coverage",
+)
+HEALTH_NEWS_MARKDOWN = "\n\n".join(f"• {news}" for news in HEALTH_NEWS_ITEMS)
+
+# Static assets
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+@st.cache_data
+def load_app_css() -> str:
+    """Read the app stylesheet once and wrap it for injection"""
+    with open(os.path.join(ASSETS_DIR, 'style.css'), encoding='utf-8') as css_file:
+        return f"<style>{css_file.read()}</style>"
+
+# City choices offered in the sidebar (first entry is the placeholder)
+CITY_OPTIONS = (
+    "Choose a city...", "Mumbai, Maharashtra", "Delhi", "Bangalore, Karnataka",
+    "Hyderabad, Telangana", "Chennai, Tamil Nadu", "Kolkata, West Bengal",
+    "Pune, Maharashtra", "Ahmedabad, Gujarat"
+)
+
+# Selectbox options on the assessment form
+GENDER_OPTIONS = ("Male", "Female", "Other")
+BLOOD_GROUPS = ("A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-", "Unknown")
+
+# Emergency symptoms offered on the assessment form
+EMERGENCY_SYMPTOMS = (
+    "Severe chest pain",
+    "Difficulty breathing",
+    "Sudden severe headache",
+    "Loss of consciousness",
+    "High fever (>103°F)",
+    "Severe bleeding"
+)
+
+# Page header (static, emitted as one element)
+APP_HEADER_HTML = (
+    "<h1 class='app-title'>🏥 MediAI Pro - भारत का स्वास्थ्य सहायक</h1>"
+    "<p class='app-subtitle'>Advanced AI-Powered Healthcare Assistant for India</p>"
+)
+
+# Page footer (only the timestamp varies per render)
+FOOTER_TEMPLATE = string.Template("""
+<div class="app-footer">
+    <h2>🏥 MediAI Pro - भारत का स्वास्थ्य सहायक</h2>
+    <p>Advanced AI-Powered Healthcare Assistant for India</p>
+    <p><strong>⚠️ Medical Disclaimer:</strong> This application provides health information for educational purposes only.
+    Always consult qualified healthcare professionals for medical advice.</p>
+    <p><strong>🚨 Emergency Numbers:</strong> 112 (National) | 108 (Medical) | 102 (Ambulance)</p>
+    <p><em>"स्वास्थ्यम् परम भाग्यम्" - Health is the Greatest Wealth</em></p>
+    <small>Generated: $timestamp | Version 3.0 | Made for India</small>
+</div>
+""")
+
+# Detailed-analysis sections, rendered one at a time
+ANALYSIS_SECTIONS = ("🤖 AI Analysis", "🏥 Hospitals", "💊 Pharmacies", "📰 Health News")
+
+# Analysis types offered in the AI section
+AI_ANALYSIS_TYPES = ("Comprehensive Health Analysis", "Symptom Assessment", "Lifestyle Recommendations")
+
+# HTML card templates (compiled once, filled per render)
+WEATHER_CARD_TEMPLATE = string.Template("""
+<div class="weather-card">
+    <h4>$title</h4>
+    <h2 style="color: $color;">$value</h2>
+    <p>$caption</p>
+</div>
+""")
+
+EMERGENCY_ALERT_TEMPLATE = string.Template("""
+<div class="emergency-alert">
+    <h2>🚨 MEDICAL EMERGENCY DETECTED</h2>
+    <p><strong>SEEK IMMEDIATE MEDICAL ATTENTION!</strong></p>
+    <p>Emergency Numbers: 📞 112 (National) | 108 (Medical) | 102 (Ambulance)</p>
+    <p><strong>Symptoms:</strong> $symptoms</p>
+</div>
+""")
+
+SCORE_CARD_TEMPLATE = string.Template("""
+<div class="metric-card centered" style="border-left-color: $color;">
+    <h2>🏥 Overall Health Score</h2>
+    <h1 class="score-value" style="color: $color;">$score/100</h1>
+    <h3>Status: $status</h3>
+    <p>$message</p>
+    <p><strong>Advice:</strong> $advice</p>
+</div>
+""")
+
+BMI_CARD_TEMPLATE = string.Template("""
+<div class="metric-card centered">
+    <h4>📏 BMI Analysis</h4>
+    <h2 style="color: $color;">$bmi</h2>
+    <p>$category</p>
+    <small>WHO Asian Guidelines</small>
+</div>
+$risk_heading
+""")
+
+AI_RESPONSE_CARD_TEMPLATE = string.Template("""
+<div class="metric-card">
+    <h4>🤖 $analysis_type</h4>
+    <div class="ai-response">
+        $response
+    </div>
+</div>
+""")
+
+HOSPITAL_CARD_TEMPLATE = string.Template("""
+<div class="facility-card">
+    <h4>$name</h4>
+    <p><strong>📍 Distance:</strong> $distance km</p>
+    <p><strong>⭐ Rating:</strong> $rating/5</p>
+    <p><strong>🏥 Type:</strong> $type</p>
+    <p><strong>📞 Phone:</strong> $phone</p>
+    <p><strong>🛏️ Beds:</strong> $beds</p>
+    <p><strong>🕒 Hours:</strong> $hours</p>
+</div>
+""")
+
+PHARMACY_CARD_TEMPLATE = string.Template("""
+<div class="facility-card">
+    <h4>$name</h4>
+    <p><strong>📍 Distance:</strong> $distance km</p>
+    <p><strong>⭐ Rating:</strong> $rating/5</p>
+    <p><strong>🏪 Type:</strong> $type</p>
+    <p><strong>💊 Specialty:</strong> $specialty</p>
+    <p><strong>🕒 Hours:</strong> $hours</p>
+</div>
+""")
+
+# Facility cards shown per section (the search stops at this many)
+FACILITY_DISPLAY_LIMIT = 5
+
+# Facility sections: (facility type, heading, plural noun, card template)
+FACILITY_SECTIONS = MappingProxyType({
+    "🏥 Hospitals": ("hospital", "### 🏥 Nearby Hospitals", "hospitals", HOSPITAL_CARD_TEMPLATE),
+    "💊 Pharmacies": ("pharmacy", "### 💊 Nearby Pharmacies", "pharmacies", PHARMACY_CARD_TEMPLATE),
+})
+
+def get_session_facilities() -> Dict[str, List[Dict]]:
+    """Nearby facilities for the current location, held in session state until it moves"""
+    lat, lon = st.session_state.coordinates
+    location_key = (round(lat, 3), round(lon, 3))
+    if st.session_state.get('facilities_key') != location_key:
+        st.session_state.facilities = get_nearby_facilities(*location_key, limit=FACILITY_DISPLAY_LIMIT)
+        st.session_state.facilities_key = location_key
+    return st.session_state.facilities
+
+# Page sections
+@st.fragment
+def render_sidebar():
+    """API key and location settings (reruns on its own until a location is set)"""
+    st.markdown("## 🔧 Configuration")
     
-    # Sidebar
-    with st.sidebar:
-        st.markdown("## 🔧 Configuration")
-        
-        # OpenAI API Key
-        with st.expander("🤖 AI Configuration", expanded=False):
+    # OpenAI API Key
+    with st.expander("🤖 AI Configuration", expanded=False):
+        # Form so the key is only applied on Save, not on every edit
+        with st.form("openai_config", border=False):
             openai_key_input = st.text_input(
                 "OpenAI API Key:",
                 type="password",
@@ -553,102 +836,86 @@ def main():
                 help="Enter your OpenAI API key for AI analysis",
                 key="openai_key_input"
             )
-            
-            if openai_key_input:
-                if openai_key_input.startswith('sk-'):
-                    st.session_state.openai_api_key_user_input = openai_key_input
-                    st.success("✅ API Key configured!")
-                else:
-                    st.error("❌ Invalid API key format")
-        
-        # Location Setup
-        st.markdown("### 📍 Location Setup")
-        
-        indian_cities = [
-            "Choose a city...", "Mumbai, Maharashtra", "Delhi", "Bangalore, Karnataka", 
-            "Hyderabad, Telangana", "Chennai, Tamil Nadu", "Kolkata, West Bengal", 
-            "Pune, Maharashtra", "Ahmedabad, Gujarat"
-        ]
+            st.form_submit_button("Save")
         
-        selected_city = st.selectbox("Select your city:", indian_cities)
-        
-        if selected_city != "Choose a city..." and st.button("📍 Set Location"):
-            coords = advanced_geocode(selected_city)
-            if coords:
-                st.session_state.coordinates = (coords['lat'], coords['lon'])
-                city_parts = selected_city.split(',')
-                st.session_state.user_location = {
-                    'city': city_parts[0].strip(),
-                    'state': city_parts[1].strip() if len(city_parts) > 1 else 'India',
-                    'country': 'India',
-                    'lat': coords['lat'],
-                    'lon': coords['lon']
-                }
-                st.session_state.location_set = True
-                st.success(f"✅ Location set: {selected_city}")
-        
-        # Display current location
-        if st.session_state.user_location:
-            loc = st.session_state.user_location
-            st.markdown(f"""
-            **📍 Current Location:**
-            - 🏙️ City: {loc.get('city', 'Unknown')}
-            - 🗺️ State: {loc.get('state', 'Unknown')}
-            - 🇮🇳 Country: {loc.get('country', 'India')}
-            """)
+        if openai_key_input:
+            if openai_key_input.startswith('sk-'):
+                st.session_state.openai_api_key_user_input = openai_key_input
+                st.success("✅ API Key configured!")
+            else:
+                st.error("❌ Invalid API key format")
     
-    # Weather Display
+    # Location Setup
+    st.markdown("### 📍 Location Setup")
+    
+    selected_city = st.selectbox("Select your city:", CITY_OPTIONS)
+    
+    if selected_city != CITY_OPTIONS[0] and st.button("📍 Set Location"):
+        coords = advanced_geocode(selected_city)
+        if coords:
+            st.session_state.coordinates = (coords['lat'], coords['lon'])
+            city_parts = selected_city.split(',')
+            st.session_state.user_location = {
+                'city': city_parts[0].strip(),
+                'state': city_parts[1].strip() if len(city_parts) > 1 else 'India',
+                'country': 'India',
+                'lat': coords['lat'],
+                'lon': coords['lon']
+            }
+            st.session_state.location_set = True
+            st.session_state.location_message = f"✅ Location set: {selected_city}"
+            # Location feeds the weather and facility panels outside this fragment
+            st.rerun()
+    
+    if st.session_state.get('location_message'):
+        st.success(st.session_state.pop('location_message'))
+    
+    # Display current location
+    if st.session_state.user_location:
+        loc = st.session_state.user_location
+        st.markdown(f"""
+        **📍 Current Location:**
+        - 🏙️ City: {loc.get('city', 'Unknown')}
+        - 🗺️ State: {loc.get('state', 'Unknown')}
+        - 🇮🇳 Country: {loc.get('country', 'India')}
+        """)
+
+def render_weather_panel():
+    """Weather cards for the current location"""
     if st.session_state.coordinates:
         lat, lon = st.session_state.coordinates
         weather_data = get_advanced_weather(lat, lon)
         
         st.markdown("## 🌤️ Current Weather & Health Context")
         
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown(f"""
-            <div class="weather-card">
-                <h4>🌡️ Temperature</h4>
-                <h2 style="color: #E91E63;">{weather_data['temperature']}°C</h2>
-                <p>Feels like {weather_data['feels_like']}°C</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown(f"""
-            <div class="weather-card">
-                <h4>💧 Humidity</h4>
-                <h2 style="color: #2196F3;">{weather_data['humidity']}%</h2>
-                <p>{weather_data['description'].title()}</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            air_quality_color = {
-                'Good': '#4CAF50', 'Moderate': '#FF9800', 
-                'Unhealthy for Sensitive Groups': '#FF5722',
-                'Unhealthy': '#F44336', 'Poor': '#9C27B0'
-            }.get(weather_data['air_quality'], '#666')
-            
-            st.markdown(f"""
-            <div class="weather-card">
-                <h4>🫁 Air Quality</h4>
-                <h2 style="color: {air_quality_color};">{weather_data['air_quality']}</h2>
-                <p>Indian Standards</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            st.markdown(f"""
-            <div class="weather-card">
-                <h4>🌪️ Wind Speed</h4>
-                <h2 style="color: #FF9800;">{weather_data['wind_speed']} m/s</h2>
-                <p>Season: {weather_data['season']}</p>
-            </div>
-            """, unsafe_allow_html=True)
-    
-    # Health Assessment Form
+        # All four cards go out as one flex row in a single st.html call
+        cards = "".join((
+            WEATHER_CARD_TEMPLATE.substitute(
+                title="🌡️ Temperature", color="#E91E63",
+                value=f"{weather_data['temperature']}°C",
+                caption=f"Feels like {weather_data['feels_like']}°C"
+            ),
+            WEATHER_CARD_TEMPLATE.substitute(
+                title="💧 Humidity", color="#2196F3",
+                value=f"{weather_data['humidity']}%",
+                caption=weather_data['description'].title()
+            ),
+            WEATHER_CARD_TEMPLATE.substitute(
+                title="🫁 Air Quality",
+                color=AIR_QUALITY_COLORS.get(weather_data['air_quality'], '#666'),
+                value=weather_data['air_quality'],
+                caption="Indian Standards"
+            ),
+            WEATHER_CARD_TEMPLATE.substitute(
+                title="🌪️ Wind Speed", color="#FF9800",
+                value=f"{weather_data['wind_speed']} m/s",
+                caption=f"Season: {weather_data['season']}"
+            ),
+        ))
+        st.html(f'<div class="weather-row">{cards}</div>')
+
+def render_health_form():
+    """Assessment form; stores each submission in session state"""
     st.markdown("---")
     st.markdown("## 👤 Health Assessment")
     
@@ -658,12 +925,12 @@ def main():
         with col1:
             name = st.text_input("Full Name")
             age = st.number_input("Age", min_value=0, max_value=120, value=30)
-            gender = st.selectbox("Gender", ["Male", "Female", "Other"])
+            gender = st.selectbox("Gender", GENDER_OPTIONS)
         
         with col2:
             weight = st.number_input("Weight (kg)", min_value=1.0, max_value=300.0, value=70.0)
             height = st.number_input("Height (cm)", min_value=50.0, max_value=250.0, value=170.0)
-            blood_group = st.selectbox("Blood Group", ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-", "Unknown"])
+            blood_group = st.selectbox("Blood Group", BLOOD_GROUPS)
         
         with col3:
             bp_systolic = st.number_input("Systolic BP", min_value=50, max_value=250, value=120)
@@ -679,41 +946,24 @@ def main():
         
         with col2:
             medications = st.text_area("Current Medications", height=100)
-            exercise_frequency = st.selectbox("Exercise Frequency", 
-                ["Never", "Rarely (less than once/week)", "1-2 times/week", "3-4 times/week", "5+ times/week"])
+            exercise_frequency = st.selectbox("Exercise Frequency", EXERCISE_FREQUENCIES)
         
-        # Emergency symptoms check
-        emergency_symptoms = st.multiselect(
+        # Emergency symptoms check (kept as a tuple: immutable, hashable, cache-key ready)
+        emergency_symptoms = tuple(st.multiselect(
             "⚠️ Emergency Symptoms (select if experiencing):",
-            [
-                "Severe chest pain",
-                "Difficulty breathing", 
-                "Sudden severe headache",
-                "Loss of consciousness",
-                "High fever (>103°F)",
-                "Severe bleeding"
-            ]
-        )
+            EMERGENCY_SYMPTOMS
+        ))
         
         submit_button = st.form_submit_button("🚀 Complete Assessment", use_container_width=True)
     
     # Emergency Alert
     if emergency_symptoms:
-        st.markdown(f"""
-        <div class="emergency-alert">
-            <h2>🚨 MEDICAL EMERGENCY DETECTED</h2>
-            <p><strong>SEEK IMMEDIATE MEDICAL ATTENTION!</strong></p>
-            <p>Emergency Numbers: 📞 112 (National) | 108 (Medical) | 102 (Ambulance)</p>
-            <p><strong>Symptoms:</strong> {', '.join(emergency_symptoms)}</p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.html(EMERGENCY_ALERT_TEMPLATE.substitute(
+            symptoms=', '.join(emergency_symptoms)
+        ))
     
     # Process Form Submission
     if submit_button and name:
-        # Calculate BMI
-        height_m = height / 100
-        bmi = weight / (height_m ** 2)
-        
         # Prepare data
         vitals_data = {
             'bp_systolic': bp_systolic,
@@ -737,180 +987,180 @@ def main():
         }
         
         # Success message
-        st.markdown("""
-        <div class="success-message">
-            <h3>✅ Assessment Completed!</h3>
-            <p>Your health data has been processed. Review your analysis below.</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Calculate health score
-        health_score = AdvancedHealthAnalytics.calculate_indian_health_score(
-            vitals_data, bmi, age, symptoms, lifestyle_data
-        )
-        
-        # Display health score
-        st.markdown("## 📊 Health Analysis")
-        
-        col1, col2 = st.columns([2, 1])
-        
-        with col1:
-            st.markdown(f"""
-            <div class="metric-card" style="text-align: center; border-left-color: {health_score['color']};">
-                <h2>🏥 Overall Health Score</h2>
-                <h1 style="color: {health_score['color']}; font-size: 4rem;">{health_score['score']}/100</h1>
-                <h3>Status: {health_score['status']}</h3>
-                <p>{health_score['message']}</p>
-                <p><strong>Advice:</strong> {health_score['advice']}</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            # BMI Display
-            bmi_category = "Normal" if 18.5 <= bmi <= 22.9 else "Underweight" if bmi < 18.5 else "Overweight"
-            bmi_color = "#4CAF50" if bmi_category == "Normal" else "#FF9800"
-            
-            st.markdown(f"""
-            <div class="metric-card" style="text-align: center;">
-                <h4>📏 BMI Analysis</h4>
-                <h2 style="color: {bmi_color};">{bmi:.1f}</h2>
-                <p>{bmi_category}</p>
-                <small>WHO Asian Guidelines</small>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Risk factors
-            if health_score['risk_factors']:
-                st.markdown("### ⚠️ Risk Factors")
-                for factor in health_score['risk_factors']:
-                    st.warning(f"• {factor}")
-        
-        # Recommendations
-        if health_score['recommendations']:
-            st.markdown("### 💡 Recommendations")
-            for rec in health_score['recommendations']:
-                st.info(f"• {rec}")
-        
-        # Create tabs for detailed analysis
-        st.markdown("---")
-        st.markdown("## 🔍 Detailed Analysis")
-        
-        tab1, tab2, tab3, tab4 = st.tabs(["🤖 AI Analysis", "🏥 Hospitals", "💊 Pharmacies", "📰 Health News"])
-        
-        with tab1:
-            st.markdown("### 🤖 AI Health Analysis")
-            
-            analysis_type = st.selectbox(
-                "Choose analysis type:",
-                ["Comprehensive Health Analysis", "Symptom Assessment", "Lifestyle Recommendations"]
-            )
-            
-            if st.button("🚀 Get AI Analysis"):
-                with st.spinner("Analyzing your health data..."):
-                    prompt = f"Provide {analysis_type.lower()} for Indian patient"
-                    
-                    try:
-                        ai_response = ai_service.get_health_analysis_sync(
-                            prompt, st.session_state.health_data, analysis_type
-                        )
-                        
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <h4>🤖 {analysis_type}</h4>
-                            <div style="background: #f8f9fa; padding: 1rem; border-radius: 8px; white-space: pre-wrap;">
-                                {ai_response}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                    except Exception as e:
-                        st.error(f"Analysis error: {str(e)}")
-        
-        with tab2:
-            st.markdown("### 🏥 Nearby Hospitals")
-            
-            if st.session_state.coordinates:
-                lat, lon = st.session_state.coordinates
-                hospitals = facilities_service.search_facilities(lat, lon, "hospital")
-                
-                if hospitals:
-                    st.info(f"Found {len(hospitals)} hospitals near your location")
-                    
-                    for hospital in hospitals[:5]:  # Show top 5
-                        st.markdown(f"""
-                        <div class="facility-card">
-                            <h4>{hospital['name']}</h4>
-                            <p><strong>📍 Distance:</strong> {hospital['distance']} km</p>
-                            <p><strong>⭐ Rating:</strong> {hospital['rating']:.1f}/5</p>
-                            <p><strong>🏥 Type:</strong> {hospital['type']}</p>
-                            <p><strong>📞 Phone:</strong> {hospital['phone']}</p>
-                            <p><strong>🛏️ Beds:</strong> {hospital['beds']}</p>
-                            <p><strong>🕒 Hours:</strong> {hospital['hours']}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                else:
-                    st.warning("No hospitals found in your area.")
-            else:
-                st.warning("Please set your location to find nearby hospitals.")
-        
-        with tab3:
-            st.markdown("### 💊 Nearby Pharmacies")
+        st.success("✅ **Assessment Completed!** Your health data has been processed. Review your analysis below.")
+
+def render_facility_section(facility_type: str, heading: str, noun: str, template: string.Template):
+    """Nearby facilities of one type as a count plus the nearest cards"""
+    st.markdown(heading)
+    
+    if not st.session_state.coordinates:
+        st.warning(f"Please set your location to find nearby {noun}.")
+        return
+    
+    facilities = get_session_facilities()[facility_type]
+    if facilities:
+        st.info(f"Showing the {len(facilities)} nearest {noun} to your location")
+        
+        # Search already stops at the display limit; ratings formatted up front, emitted as one element
+        ratings = [f"{facility['rating']:.1f}" for facility in facilities]
+        st.html("".join(
+            template.substitute(facility, rating=rating)
+            for facility, rating in zip(facilities, ratings)
+        ))
+    else:
+        st.warning(f"No {noun} found in your area.")
+
+@st.fragment
+def render_ai_analysis_tab(payload_hash: str):
+    """AI analysis controls; reruns on its own so the rest of the panel is left alone"""
+    st.markdown("### 🤖 AI Health Analysis")
+    
+    analysis_type = st.selectbox("Choose analysis type:", AI_ANALYSIS_TYPES)
+    
+    if st.button("🚀 Get AI Analysis"):
+        # Answers are reused per health data, analysis type and live/demo mode; new data starts afresh
+        responses = st.session_state.get('ai_responses')
+        if not responses or responses['hash'] != payload_hash:
+            responses = st.session_state.ai_responses = {'hash': payload_hash, 'answers': {}}
+        # One key lookup decides the requested mode and is handed to the stream
+        service = get_ai_service()
+        api_key = service.get_api_key()
+        answer_key = (analysis_type, service.is_live_key(api_key))
+        ai_response = responses['answers'].get(answer_key)
+        
+        if ai_response is None:
+            prompt = f"Provide {analysis_type.lower()} for Indian patient"
+            stream = service.stream_health_analysis(prompt, st.session_state.health_data, analysis_type, api_key)
             
-            if st.session_state.coordinates:
-                lat, lon = st.session_state.coordinates
-                pharmacies = facilities_service.search_facilities(lat, lon, "pharmacy")
-                
-                if pharmacies:
-                    st.info(f"Found {len(pharmacies)} pharmacies near your location")
-                    
-                    for pharmacy in pharmacies[:5]:  # Show top 5
-                        st.markdown(f"""
-                        <div class="facility-card">
-                            <h4>{pharmacy['name']}</h4>
-                            <p><strong>📍 Distance:</strong> {pharmacy['distance']} km</p>
-                            <p><strong>⭐ Rating:</strong> {pharmacy['rating']:.1f}/5</p>
-                            <p><strong>🏪 Type:</strong> {pharmacy['type']}</p>
-                            <p><strong>💊 Specialty:</strong> {pharmacy['specialty']}</p>
-                            <p><strong>🕒 Hours:</strong> {pharmacy['hours']}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                else:
-                    st.warning("No pharmacies found in your area.")
-            else:
-                st.warning("Please set your location to find nearby pharmacies.")
+            try:
+                # Stream into a status box as chunks arrive; the styled card below holds the final text
+                with st.status("Analyzing your health data...", expanded=True) as status:
+                    ai_response = st.write_stream(stream).strip()
+                    status.update(label="Analysis complete", state="complete", expanded=False)
+                # Keep only answers from the requested mode; a live call that fell back is retried next click
+                if stream.live == answer_key[1]:
+                    responses['answers'][answer_key] = ai_response
+            except Exception as e:
+                st.error(f"Analysis error: {str(e)}")
         
-        with tab4:
-            st.markdown("### 📰 Latest Health News")
-            st.info("Health news feature coming soon...")
-            
-            # Sample news items
-            news_items = [
-                "🇮🇳 AIIMS launches new telemedicine services across rural India",
-                "💊 Jan Aushadhi scheme reaches 8,000 stores nationwide", 
-                "🌿 New Ayurveda research shows promising results for diabetes",
-                "🏥 Government announces expansion of Ayushman Bharat coverage"
-            ]
-            
-            for news in news_items:
-                st.markdown(f"• {news}")
+        if ai_response is not None:
+            st.session_state.last_ai_response = {
+                'hash': payload_hash,
+                'analysis_type': analysis_type,
+                'response': ai_response
+            }
+    
+    # Keep the last analysis visible until the health data changes
+    last_response = st.session_state.get('last_ai_response')
+    if last_response and last_response['hash'] == payload_hash:
+        st.markdown(AI_RESPONSE_CARD_TEMPLATE.substitute(last_response), unsafe_allow_html=True)
+
+@st.fragment
+def render_analysis_panel():
+    """Score, risk factors and detail tabs derived from the stored health data"""
+    health_data = st.session_state.health_data
+    
+    # Recompute BMI and score only when the submitted payload changes
+    payload_hash = hashlib.sha256(orjson.dumps(health_data, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    if st.session_state.get('analysis_hash') != payload_hash:
+        patient = health_data['patient']
+        bmi, bmi_category, bmi_color = bmi_bundle(patient['weight'], patient['height'])
+        health_score = AdvancedHealthAnalytics.calculate_indian_health_score(
+            health_data['vitals'], bmi, patient['age'], health_data['symptoms'], health_data['lifestyle']
+        )
+        st.session_state.analysis = (bmi, bmi_category, bmi_color, health_score)
+        st.session_state.analysis_hash = payload_hash
+    bmi, bmi_category, bmi_color, health_score = st.session_state.analysis
+    
+    # Display health score
+    st.markdown("## 📊 Health Analysis")
+    
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        st.html(SCORE_CARD_TEMPLATE.substitute(health_score))
+    
+    with col2:
+        # BMI card and risk-factor heading share one st.html call
+        risk_heading = "<h3>⚠️ Risk Factors</h3>" if health_score['risk_factors'] else ""
+        st.html(BMI_CARD_TEMPLATE.substitute(
+            bmi=f"{bmi:.1f}", color=bmi_color, category=bmi_category, risk_heading=risk_heading
+        ))
+        
+        # Risk factors (one element for the whole list)
+        if health_score['risk_factors']:
+            st.warning("\n\n".join(f"• {factor}" for factor in health_score['risk_factors']))
+    
+    # Recommendations
+    if health_score['recommendations']:
+        st.markdown("### 💡 Recommendations")
+        st.info("\n\n".join(f"• {rec}" for rec in health_score['recommendations']))
+    
+    # Detailed analysis sections
+    st.markdown("---")
+    st.markdown("## 🔍 Detailed Analysis")
+    
+    # Only the selected section is built on each run
+    section = st.radio(
+        "Section", ANALYSIS_SECTIONS, horizontal=True, key="active_section", label_visibility="collapsed"
+    )
+    
+    if section == "🤖 AI Analysis":
+        render_ai_analysis_tab(payload_hash)
+    
+    elif section in FACILITY_SECTIONS:
+        render_facility_section(*FACILITY_SECTIONS[section])
+    
+    else:
+        st.markdown("### 📰 Latest Health News")
+        st.info("Health news feature coming soon...")
+        st.markdown(HEALTH_NEWS_MARKDOWN)
+
+def _timestamp() -> str:
+    """Local time to the minute, so the footer is unchanged between reruns"""
+    return time.strftime('%Y-%m-%d %H:%M')
 
+# Main Application
+def main():
+    # CSS Styling (st.html skips the markdown parser; re-emitted each run so it survives reruns)
+    st.html(load_app_css())
+    
+    # Header
+    st.html(APP_HEADER_HTML)
+    
+    # Initialize session state
+    if 'user_location' not in st.session_state:
+        st.session_state.user_location = None
+    if 'coordinates' not in st.session_state:
+        st.session_state.coordinates = None
+    if 'health_data' not in st.session_state:
+        st.session_state.health_data = {}
+    if 'location_set' not in st.session_state:
+        st.session_state.location_set = False
+    
+    # Sidebar
+    with st.sidebar:
+        render_sidebar()
+    
+    # Weather Display
+    render_weather_panel()
+    
+    # Health Assessment Form (analysis stays on screen after the first submission)
+    render_health_form()
+    if st.session_state.health_data:
+        render_analysis_panel()
+    
     # Footer
     st.markdown("---")
-    st.markdown(f"""
-    <div style="text-align: center; padding: 2rem; background: linear-gradient(135deg, #007C91, #B1AFFF); color: white; border-radius: 15px; margin: 2rem 0;">
-        <h2>🏥 MediAI Pro - भारत का स्वास्थ्य सहायक</h2>
-        <p>Advanced AI-Powered Healthcare Assistant for India</p>
-        <p><strong>⚠️ Medical Disclaimer:</strong> This application provides health information for educational purposes only. 
-        Always consult qualified healthcare professionals for medical advice.</p>
-        <p><strong>🚨 Emergency Numbers:</strong> 112 (National) | 108 (Medical) | 102 (Ambulance)</p>
-        <p><em>"स्वास्थ्यम् परम भाग्यम्" - Health is the Greatest Wealth</em></p>
-        <small>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Version 3.0 | Made for India</small>
-    </div>
-    """, unsafe_allow_html=True)
+    st.html(FOOTER_TEMPLATE.substitute(timestamp=_timestamp()))
 
 if __name__ == "__main__":
     try:
         main()
     except Exception as e:
+        logger.exception("Application error")
         st.error(f"Application error: {e}")
+        # Full traceback only when debugging; it is always in the server log
+        if os.environ.get('MEDIAI_DEBUG') == '1':
+            st.exception(e)
         st.info("Please refresh the page or check your configuration.")